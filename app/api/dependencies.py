@@ -7,47 +7,72 @@ Removed:
 Kept:
 - get_sap_service (data fetching)
 - get_sap_write_service (write-back)
+- get_sap_executor (thread pool for blocking SAP calls)
+
+Services are built once in the application lifespan (app.state) and reused across requests.
 """
 
-from fastapi import HTTPException
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request
 from app.services.sap_service import SAPService
 from app.services.sap_write_service import SAPWriteService
-from app.config import get_settings
-
+from app.config import Settings
 
-def get_sap_service() -> SAPService:
-    """Dependency for SAP read service"""
-    return SAPService()
 
-
-def get_sap_write_service() -> SAPWriteService:
-    """Dependency for SAP write service with validation"""
-    settings = get_settings()
-    
+def _check_write_config(settings: Settings) -> Optional[Tuple[int, str]]:
+    """Return the (status_code, detail) of the first write configuration problem, if any"""
     # Check if write operations are enabled
     if not settings.ENABLE_WRITE_OPERATIONS:
-        raise HTTPException(
-            status_code=403,
-            detail="Write operations are disabled. Set ENABLE_WRITE_OPERATIONS=true in configuration."
+        return (
+            403,
+            "Write operations are disabled. Set ENABLE_WRITE_OPERATIONS=true in configuration."
         )
-    
+
     # Validate required write configuration
     if not settings.SAP_WRITE_API_URL:
-        raise HTTPException(
-            status_code=500,
-            detail="SAP_WRITE_API_URL not configured"
-        )
-    
+        return 500, "SAP_WRITE_API_URL not configured"
+
     if not settings.SAP_PLANNING_AREA:
-        raise HTTPException(
-            status_code=500,
-            detail="SAP_PLANNING_AREA not configured"
-        )
-    
+        return 500, "SAP_PLANNING_AREA not configured"
+
     if not settings.SAP_XYZ_KEY_FIGURE:
-        raise HTTPException(
-            status_code=500,
-            detail="SAP_XYZ_KEY_FIGURE not configured"
-        )
-    
-    return SAPWriteService()
\ No newline at end of file
+        return 500, "SAP_XYZ_KEY_FIGURE not configured"
+
+    return None
+
+
+def validate_write_config_once(settings: Settings) -> Tuple[Optional[SAPWriteService], Optional[Tuple[int, str]]]:
+    """
+    Validate write configuration and build the write service; called once at startup
+
+    Returns (service, None) when configured, otherwise (None, (status_code, detail))
+    """
+    error = _check_write_config(settings)
+    if error is not None:
+        return None, error
+
+    return SAPWriteService(), None
+
+
+async def get_sap_service(request: Request) -> SAPService:
+    """Dependency for SAP read service built at startup"""
+    return request.app.state.sap_service
+
+
+async def get_sap_write_service(request: Request) -> SAPWriteService:
+    """Dependency for SAP write service; validation happened once at startup"""
+    # Happy path is a single state lookup and an `is None` check; the service is
+    # only missing when startup validation recorded an error
+    service = request.app.state.sap_write_service
+    if service is None:
+        status_code, detail = request.app.state.write_config_error
+        raise HTTPException(status_code=status_code, detail=detail)
+
+    return service
+
+
+async def get_sap_executor(request: Request) -> ThreadPoolExecutor:
+    """Dependency for the thread pool that runs blocking SAP calls"""
+    return request.app.state.sap_executor
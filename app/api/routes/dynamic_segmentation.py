@@ -238,7 +238,7 @@ async def analyze_dynamic_segmentation(
             )
         
         # Get segment distribution
-        segment_distribution = result_df['XYZ_Segment'].value_counts().to_dict()
+        segment_distribution = DynamicAnalysisService.count_segments(result_df['XYZ_Segment'])
         
         # Convert to response format
         data = result_df.to_dict('records')
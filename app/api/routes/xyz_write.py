@@ -9,11 +9,17 @@ Key fixes:
 """
 
 from fastapi import APIRouter, Depends, Query, HTTPException, Body
+from fastapi.responses import ORJSONResponse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional
-from enum import Enum
+import logging
+import time
+from typing import Optional, List, Dict, Any
+import pandas as pd
 
 from app.models.write_schemas import (
+    WriteMode,
     XYZWriteRequest,
     XYZWriteResponse,
     XYZWriteStatus,
@@ -21,28 +27,72 @@ from app.models.write_schemas import (
 )
 from app.services.sap_service import SAPService
 from app.services.sap_write_service import SAPWriteService
-from app.services.dynamic_analysis_service import DynamicAnalysisService
+from app.services.dynamic_analysis_service import DynamicAnalysisService, XYZ_SEGMENT_DTYPE
 from app.models.segmentation_schemas import SegmentationConfig
-from app.api.dependencies import get_sap_service, get_sap_write_service
+from app.api.dependencies import get_sap_service, get_sap_write_service, get_sap_executor
 from app.config import get_settings
+from app.utils.concurrency import run_blocking
 from app.utils.logger import get_logger
 
 router = APIRouter(prefix="/api/v1/xyz-write", tags=["XYZ Write-Back"])
 logger = get_logger(__name__)
 
+# Settings are fixed for the process lifetime; bind the hot values once at import
+_SETTINGS = get_settings()
+_X_DEFAULT = _SETTINGS.DEFAULT_X_THRESHOLD
+_Y_DEFAULT = _SETTINGS.DEFAULT_Y_THRESHOLD
 
-class WriteMode(str, Enum):
-    """Write mode options"""
-    SIMPLE = "simple"
-    BATCHED = "batched"
-    PARALLEL = "parallel"
+_WRITE_CONFIG_STATUS = {
+    "sap_write_api_url": bool(_SETTINGS.SAP_WRITE_API_URL),
+    "planning_area": bool(_SETTINGS.SAP_PLANNING_AREA),
+    "xyz_key_figure": bool(_SETTINGS.SAP_XYZ_KEY_FIGURE),
+    "credentials_configured": bool(_SETTINGS.SAP_USERNAME and _SETTINGS.SAP_PASSWORD)
+}
+_WRITE_CONFIGURED = all(_WRITE_CONFIG_STATUS.values())
+
+
+# Cap on offending row indexes echoed back in validation errors
+MAX_REPORTED_ROWS = 20
+
+
+# Write mode -> service method; invalid modes are rejected by the request model (422)
+_WRITE_DISPATCH = {
+    WriteMode.SIMPLE: SAPWriteService.write_segments_simple,
+    WriteMode.BATCHED: SAPWriteService.write_segments_batched,
+    WriteMode.PARALLEL: SAPWriteService.write_segments_parallel,
+}
+
+
+def _elapsed_ms(start):
+    """Return (milliseconds since start, new start) for stage timing"""
+    now = time.perf_counter()
+    return round((now - start) * 1000, 1), now
+
+
+def _project_write_columns(result_df, write_columns):
+    """Select the write columns without copying: the new frame shares result_df's column buffers"""
+    return pd.DataFrame({column: result_df[column] for column in write_columns}, copy=False)
+
+
+def _attach_period_field(write_df, df, groupby_attrs, period_field):
+    """Add the first period of each segment group to write_df via a keyed lookup (no merge)"""
+    period_lookup = df.groupby(groupby_attrs, sort=False)[period_field].first()
+    
+    if len(groupby_attrs) == 1:
+        write_df[period_field] = write_df[groupby_attrs[0]].map(period_lookup)
+    else:
+        keys = write_df.set_index(groupby_attrs).index
+        write_df[period_field] = period_lookup.reindex(keys).to_numpy()
+    
+    return write_df
 
 
 @router.post("/write-segments", response_model=XYZWriteResponse)
 async def write_xyz_segments(
     request: XYZWriteRequest = Body(...),
     sap_service: SAPService = Depends(get_sap_service),
-    write_service: SAPWriteService = Depends(get_sap_write_service)
+    write_service: SAPWriteService = Depends(get_sap_write_service),
+    executor: ThreadPoolExecutor = Depends(get_sap_executor)
 ):
     """
     Perform XYZ analysis and write segments back to SAP IBP
@@ -61,9 +111,8 @@ async def write_xyz_segments(
     }
     ```
     """
-    settings = get_settings()
-    x_thresh = request.x_threshold or settings.DEFAULT_X_THRESHOLD
-    y_thresh = request.y_threshold or settings.DEFAULT_Y_THRESHOLD
+    x_thresh = request.x_threshold or _X_DEFAULT
+    y_thresh = request.y_threshold or _Y_DEFAULT
     
     # Determine if this is dynamic segmentation or simple
     if request.groupby_attributes:
@@ -72,7 +121,7 @@ async def write_xyz_segments(
         groupby_attrs = request.groupby_attributes
         
         logger.info(
-            f"XYZ write-back (DYNAMIC) requested: mode={request.write_mode}, "
+            f"XYZ write-back (DYNAMIC) requested: mode={request.write_mode.value}, "
             f"primary_key={primary_key}, groupby={groupby_attrs}, "
             f"version={request.version_id}, X={x_thresh}, Y={y_thresh}"
         )
@@ -82,31 +131,39 @@ async def write_xyz_segments(
         groupby_attrs = ["PRDID"]
         
         logger.info(
-            f"XYZ write-back (SIMPLE) requested: mode={request.write_mode}, "
+            f"XYZ write-back (SIMPLE) requested: mode={request.write_mode.value}, "
             f"version={request.version_id}, X={x_thresh}, Y={y_thresh}"
         )
     
+    # Per-stage timings are reported in a single completion record
+    stage_timings = {}
+    stage_start = time.perf_counter()
+    
     try:
         # Step 1: Fetch data from SAP
-        logger.info(f"Step 1: Fetching data from SAP IBP with primary_key={primary_key}")
-        
         # Determine additional attributes to fetch
         additional_attrs = [attr for attr in groupby_attrs if attr != primary_key]
         
-        df = sap_service.fetch_data(
+        df = await run_blocking(
+            executor,
+            sap_service.fetch_data,
             primary_key=primary_key,
             additional_filters=request.filters,
             additional_attributes=additional_attrs
         )
         
-        if df.empty:
+        # Read shape and columns once for all checks below
+        n_rows = df.shape[0]
+        source_columns = frozenset(df.columns)
+        
+        if n_rows == 0:
             raise HTTPException(status_code=404, detail="No data found with given filters")
         
-        logger.info(f"Fetched {len(df)} records with columns: {list(df.columns)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Fetched {n_rows} records with columns: {list(df.columns)}")
+        stage_timings["fetch_ms"], stage_start = _elapsed_ms(stage_start)
         
         # Step 2: Perform XYZ analysis
-        logger.info(f"Step 2: Performing XYZ segmentation with groupby={groupby_attrs}")
-        
         # Build segmentation config
         config = SegmentationConfig(
             primary_key=primary_key,
@@ -119,7 +176,9 @@ async def write_xyz_segments(
         
         # Use dynamic analysis service
         analysis_service = DynamicAnalysisService()
-        result_df, data_quality = analysis_service.calculate_dynamic_xyz_segmentation(df, config)
+        result_df, data_quality = await run_blocking(
+            executor, analysis_service.calculate_dynamic_xyz_segmentation, df, config
+        )
         
         if result_df.empty:
             raise HTTPException(
@@ -127,62 +186,57 @@ async def write_xyz_segments(
                 detail="No segments produced. Try adjusting thresholds or filters."
             )
         
-        logger.info(f"Analysis complete: {len(result_df)} segments produced")
+        stage_timings["analysis_ms"], stage_start = _elapsed_ms(stage_start)
         
         # Step 3: Prepare data for write-back
         # Keep all grouping dimensions plus XYZ_Segment
         write_columns = groupby_attrs + ['XYZ_Segment']
-        write_df = result_df[write_columns].copy()
+        write_df = _project_write_columns(result_df, write_columns)
         
         # Add period field if available and not already in groupby
-        if request.period_field and request.period_field in df.columns:
-            if request.period_field not in write_df.columns:
+        if request.period_field and request.period_field in source_columns:
+            if request.period_field not in write_columns:
                 # Get the first period for each unique combination
-                period_data = df.groupby(groupby_attrs)[request.period_field].first().reset_index()
-                write_df = write_df.merge(period_data, on=groupby_attrs, how='left')
+                write_df = _attach_period_field(write_df, df, groupby_attrs, request.period_field)
         
-        logger.info(f"Prepared {len(write_df)} segments for write-back")
-        logger.info(f"Write columns: {list(write_df.columns)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Prepared {len(write_df)} segments for write-back, columns: {list(write_df.columns)}")
+        stage_timings["prepare_ms"], stage_start = _elapsed_ms(stage_start)
         
         # Step 4: Write to SAP based on mode
-        logger.info(f"Step 3: Writing to SAP IBP using {request.write_mode} mode")
-        
-        if request.write_mode == WriteMode.SIMPLE:
-            write_result = write_service.write_segments_simple(
-                segment_data=write_df,
-                primary_key=primary_key,
-                version_id=request.version_id,
-                scenario_id=request.scenario_id,
-                period_field=request.period_field or "PERIODID3_TSTAMP"
-            )
-        
-        elif request.write_mode == WriteMode.BATCHED:
-            write_result = write_service.write_segments_batched(
-                segment_data=write_df,
-                primary_key=primary_key,
-                version_id=request.version_id,
-                scenario_id=request.scenario_id,
-                period_field=request.period_field or "PERIODID3_TSTAMP",
-                batch_size=request.batch_size or 5000
-            )
+        write_kwargs = dict(
+            segment_data=write_df,
+            primary_key=primary_key,
+            version_id=request.version_id,
+            scenario_id=request.scenario_id,
+            period_field=request.period_field or "PERIODID3_TSTAMP"
+        )
+        if request.write_mode != WriteMode.SIMPLE:
+            write_kwargs["batch_size"] = request.batch_size or 5000
+        if request.write_mode == WriteMode.PARALLEL:
+            write_kwargs["max_workers"] = request.max_workers or 4
         
-        elif request.write_mode == WriteMode.PARALLEL:
-            write_result = write_service.write_segments_parallel(
-                segment_data=write_df,
-                primary_key=primary_key,
-                version_id=request.version_id,
-                scenario_id=request.scenario_id,
-                period_field=request.period_field or "PERIODID3_TSTAMP",
-                batch_size=request.batch_size or 5000,
-                max_workers=request.max_workers or 4
-            )
+        write_result = await run_blocking(
+            executor, _WRITE_DISPATCH[request.write_mode], write_service, **write_kwargs
+        )
         
         # Calculate segment distribution
-        segment_counts = result_df['XYZ_Segment'].value_counts().to_dict()
+        segment_counts = DynamicAnalysisService.count_segments(write_df['XYZ_Segment'])
         
-        logger.info(f"Write operation completed successfully: {write_result.get('transaction_id')}")
+        stage_timings["write_ms"], _ = _elapsed_ms(stage_start)
         
-        return XYZWriteResponse(
+        logger.info(
+            "XYZ write-back completed",
+            extra={"extra_data": {
+                "stage_timings": stage_timings,
+                "mode": request.write_mode.value,
+                "records": len(write_df),
+                "transaction_id": write_result.get('transaction_id')
+            }}
+        )
+        
+        # Fields are computed server-side, so skip re-validation and serialize directly
+        return ORJSONResponse(XYZWriteResponse.model_construct(
             status="success",
             transaction_id=write_result.get('transaction_id'),
             total_products=len(result_df),
@@ -200,7 +254,7 @@ async def write_xyz_segments(
             batch_count=write_result.get('batch_count'),
             message=write_result.get('message'),
             timestamp=datetime.utcnow().isoformat()
-        )
+        ).model_dump())
         
     except HTTPException:
         raise
@@ -211,13 +265,14 @@ async def write_xyz_segments(
 
 @router.post("/write-custom", response_model=XYZWriteResponse)
 async def write_custom_segments(
-    segments: list = Body(..., description="List of segment assignments"),
+    segments: List[Dict[str, Any]] = Body(..., description="List of segment assignments"),
     primary_key: str = Body("PRDID", description="Primary key for segmentation"),
     version_id: Optional[str] = Body(None),
     scenario_id: Optional[str] = Body(None),
     period_field: str = Body("PERIODID3_TSTAMP"),
     write_mode: WriteMode = Body(WriteMode.SIMPLE),
-    write_service: SAPWriteService = Depends(get_sap_write_service)
+    write_service: SAPWriteService = Depends(get_sap_write_service),
+    executor: ThreadPoolExecutor = Depends(get_sap_executor)
 ):
     """
     Write custom XYZ segment assignments to SAP IBP
@@ -238,58 +293,64 @@ async def write_custom_segments(
     logger.info(f"Custom segment write requested: {len(segments)} segments, primary_key={primary_key}")
     
     try:
-        import pandas as pd
-        
-        # Convert to DataFrame
-        write_df = pd.DataFrame(segments)
+        # Build the DataFrame column-wise in a single pass over the payload
+        segment_count = len(segments)
+        columns = {}
+        missing_fields = not segments
+        
+        for i, segment in enumerate(segments):
+            for field, value in segment.items():
+                column = columns.get(field)
+                if column is None:
+                    column = columns[field] = [None] * segment_count
+                column[i] = value
+            
+            if primary_key not in segment or 'XYZ_Segment' not in segment:
+                missing_fields = True
+                break
         
         # Validate required columns
-        if primary_key not in write_df.columns or 'XYZ_Segment' not in write_df.columns:
+        if missing_fields:
             raise HTTPException(
                 status_code=400,
                 detail=f"Each segment must have '{primary_key}' and 'XYZ_Segment' fields"
             )
         
-        # Validate segment values
-        valid_segments = {'X', 'Y', 'Z'}
-        invalid_segments = set(write_df['XYZ_Segment'].unique()) - valid_segments
-        if invalid_segments:
+        # Validate segment values with one vectorized check over categorical codes (-1 = not X/Y/Z)
+        raw_segments = columns['XYZ_Segment']
+        segments_cat = pd.Categorical(raw_segments, dtype=XYZ_SEGMENT_DTYPE)
+        invalid_rows = (segments_cat.codes == -1).nonzero()[0]
+        if len(invalid_rows):
+            invalid_segments = {raw_segments[i] for i in invalid_rows}
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid segment values: {invalid_segments}. Must be X, Y, or Z"
+                detail=(
+                    f"Invalid segment values: {invalid_segments} at rows "
+                    f"{invalid_rows[:MAX_REPORTED_ROWS].tolist()}. Must be X, Y, or Z"
+                )
             )
         
+        columns['XYZ_Segment'] = segments_cat
+        write_df = pd.DataFrame(columns)
+        
         logger.info(f"Writing {len(write_df)} custom segments with primary_key={primary_key}")
         
         # Write based on mode
-        if write_mode == WriteMode.SIMPLE:
-            write_result = write_service.write_segments_simple(
-                segment_data=write_df,
-                primary_key=primary_key,
-                version_id=version_id,
-                scenario_id=scenario_id,
-                period_field=period_field
-            )
-        elif write_mode == WriteMode.BATCHED:
-            write_result = write_service.write_segments_batched(
-                segment_data=write_df,
-                primary_key=primary_key,
-                version_id=version_id,
-                scenario_id=scenario_id,
-                period_field=period_field
-            )
-        else:
-            write_result = write_service.write_segments_parallel(
-                segment_data=write_df,
-                primary_key=primary_key,
-                version_id=version_id,
-                scenario_id=scenario_id,
-                period_field=period_field
-            )
+        write_result = await run_blocking(
+            executor,
+            _WRITE_DISPATCH[write_mode],
+            write_service,
+            segment_data=write_df,
+            primary_key=primary_key,
+            version_id=version_id,
+            scenario_id=scenario_id,
+            period_field=period_field
+        )
         
-        segment_counts = write_df['XYZ_Segment'].value_counts().to_dict()
+        segment_counts = DynamicAnalysisService.count_segments(write_df['XYZ_Segment'])
         
-        return XYZWriteResponse(
+        # Fields are computed server-side, so skip re-validation and serialize directly
+        return ORJSONResponse(XYZWriteResponse.model_construct(
             status="success",
             transaction_id=write_result.get('transaction_id'),
             total_products=len(write_df),
@@ -302,7 +363,7 @@ async def write_custom_segments(
             batch_count=write_result.get('batch_count'),
             message=write_result.get('message'),
             timestamp=datetime.utcnow().isoformat()
-        )
+        ).model_dump())
         
     except HTTPException:
         raise
@@ -314,47 +375,38 @@ async def write_custom_segments(
 @router.get("/status/{transaction_id}", response_model=XYZWriteStatus)
 async def get_write_status(
     transaction_id: str,
-    write_service: SAPWriteService = Depends(get_sap_write_service)
+    write_service: SAPWriteService = Depends(get_sap_write_service),
+    executor: ThreadPoolExecutor = Depends(get_sap_executor)
 ):
     """Get the status of a write transaction"""
     logger.info(f"Status check requested for transaction: {transaction_id}")
     
     try:
-        session, csrf_token = write_service._get_csrf_token()
+        # One warm session/token pair serves both SAP calls
+        session, csrf_token = await run_blocking(executor, write_service._ensure_csrf)
+        
+        # The two lookups are independent, so issue them concurrently
+        export_result, messages = await asyncio.gather(
+            run_blocking(executor, write_service._get_export_result, session, csrf_token, transaction_id),
+            run_blocking(executor, write_service._get_messages, session, csrf_token, transaction_id),
+            return_exceptions=True
+        )
         
-        try:
-            export_result = write_service._get_export_result(session, csrf_token, transaction_id)
-            
+        if isinstance(export_result, Exception):
+            raise export_result
+        
+        # Message lookup failures are not fatal for a status check
+        if isinstance(messages, Exception):
+            logger.warning(f"Could not fetch messages: {str(messages)}")
             messages = []
-            try:
-                msg_session, msg_csrf = write_service._get_csrf_token()
-                try:
-                    url = f"{write_service.api_url}/Message"
-                    response = msg_session.get(
-                        url,
-                        params={"Transactionid": transaction_id},
-                        headers={"X-CSRF-Token": msg_csrf},
-                        timeout=write_service.timeout
-                    )
-                    if response.ok:
-                        messages = response.json()
-                except Exception as e:
-                    logger.warning(f"Could not fetch messages: {str(e)}")
-                finally:
-                    msg_session.close()
-            except Exception:
-                pass
-            
-            return XYZWriteStatus(
-                transaction_id=transaction_id,
-                status="completed" if export_result else "unknown",
-                export_result=export_result,
-                messages=messages,
-                timestamp=datetime.utcnow().isoformat()
-            )
         
-        finally:
-            session.close()
+        return XYZWriteStatus(
+            transaction_id=transaction_id,
+            status="completed" if export_result else "unknown",
+            export_result=export_result,
+            messages=messages,
+            timestamp=datetime.utcnow().isoformat()
+        )
         
     except Exception as e:
         logger.error(f"Status check failed: {str(e)}", exc_info=True)
@@ -366,21 +418,10 @@ async def validate_write_config(
     write_service: SAPWriteService = Depends(get_sap_write_service)
 ):
     """Validate write configuration"""
-    settings = get_settings()
-    
-    config_status = {
-        "sap_write_api_url": bool(settings.SAP_WRITE_API_URL),
-        "planning_area": bool(settings.SAP_PLANNING_AREA),
-        "xyz_key_figure": bool(settings.SAP_XYZ_KEY_FIGURE),
-        "credentials_configured": bool(settings.SAP_USERNAME and settings.SAP_PASSWORD)
-    }
-    
-    all_configured = all(config_status.values())
-    
     return {
-        "configured": all_configured,
-        "configuration": config_status,
-        "message": "All settings configured" if all_configured else "Missing required settings",
+        "configured": _WRITE_CONFIGURED,
+        "configuration": _WRITE_CONFIG_STATUS,
+        "message": "All settings configured" if _WRITE_CONFIGURED else "Missing required settings",
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -388,15 +429,15 @@ async def validate_write_config(
 async def debug_write_payload(
     request: XYZWriteRequest = Body(...),
     sap_service: SAPService = Depends(get_sap_service),
-    write_service: SAPWriteService = Depends(get_sap_write_service)
+    write_service: SAPWriteService = Depends(get_sap_write_service),
+    executor: ThreadPoolExecutor = Depends(get_sap_executor)
 ):
     """
     DEBUG ENDPOINT: Generate and return the payload that would be sent to SAP
     without actually sending it. Use this to troubleshoot SAP write issues.
     """
-    settings = get_settings()
-    x_thresh = request.x_threshold or settings.DEFAULT_X_THRESHOLD
-    y_thresh = request.y_threshold or settings.DEFAULT_Y_THRESHOLD
+    x_thresh = request.x_threshold or _X_DEFAULT
+    y_thresh = request.y_threshold or _Y_DEFAULT
     
     # Determine configuration
     if request.groupby_attributes:
@@ -409,7 +450,9 @@ async def debug_write_payload(
     try:
         # Fetch data
         additional_attrs = [attr for attr in groupby_attrs if attr != primary_key]
-        df = sap_service.fetch_data(
+        df = await run_blocking(
+            executor,
+            sap_service.fetch_data,
             primary_key=primary_key,
             additional_filters=request.filters,
             additional_attributes=additional_attrs
@@ -419,9 +462,6 @@ async def debug_write_payload(
             raise HTTPException(status_code=404, detail="No data found")
         
         # Perform analysis
-        from app.services.dynamic_analysis_service import DynamicAnalysisService
-        from app.models.segmentation_schemas import SegmentationConfig
-        
         config = SegmentationConfig(
             primary_key=primary_key,
             groupby_attributes=groupby_attrs,
@@ -432,20 +472,21 @@ async def debug_write_payload(
         )
         
         analysis_service = DynamicAnalysisService()
-        result_df, data_quality = analysis_service.calculate_dynamic_xyz_segmentation(df, config)
+        result_df, data_quality = await run_blocking(
+            executor, analysis_service.calculate_dynamic_xyz_segmentation, df, config
+        )
         
         if result_df.empty:
             raise HTTPException(status_code=422, detail="No segments produced")
         
         # Prepare write data
         write_columns = groupby_attrs + ['XYZ_Segment']
-        write_df = result_df[write_columns].copy()
+        write_df = _project_write_columns(result_df, write_columns)
         
         # Add period field
         if request.period_field and request.period_field in df.columns:
             if request.period_field not in write_df.columns:
-                period_data = df.groupby(groupby_attrs)[request.period_field].first().reset_index()
-                write_df = write_df.merge(period_data, on=groupby_attrs, how='left')
+                write_df = _attach_period_field(write_df, df, groupby_attrs, request.period_field)
         
         # Generate transaction ID
         transaction_id = write_service._generate_transaction_id()
@@ -485,7 +526,7 @@ async def debug_write_payload(
             },
             "data_analysis": {
                 "total_segments": len(result_df),
-                "segment_distribution": result_df['XYZ_Segment'].value_counts().to_dict(),
+                "segment_distribution": DynamicAnalysisService.count_segments(write_df['XYZ_Segment']),
                 "primary_key": primary_key,
                 "dimensions_included": list(write_df.columns)
             },
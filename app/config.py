@@ -25,6 +25,7 @@ class Settings(BaseSettings):
     SAP_PLANNING_AREA: str = ""  # e.g., SAP1, SAP2, YSAPIBP1
     SAP_XYZ_KEY_FIGURE: str = "XYZID"  # Name of the key figure in IBP to store segment
     SAP_ENABLE_NULL_HANDLING: bool = False  # Set to True if ENABLE_NULL_INFO parameter is set in SAP IBP
+    SAP_COMPRESS_REQUESTS: bool = True  # gzip write payloads (Content-Encoding: gzip); disable if the gateway rejects it
     
     # Analysis Configuration
     DEFAULT_X_THRESHOLD: float = 10.0
@@ -33,6 +34,7 @@ class Settings(BaseSettings):
     # Write Configuration
     DEFAULT_BATCH_SIZE: int = 5000
     DEFAULT_MAX_WORKERS: int = 4
+    ENCODE_PROCESSES: int = 0  # >0 encodes parallel-mode batches in a process pool of this size; 0 uses threads
     ENABLE_WRITE_OPERATIONS: bool = False  # Safety flag - must be explicitly enabled
     
     # Logging
@@ -8,10 +8,14 @@ Removed:
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
 
 from app.config import get_settings
+from app.api.dependencies import validate_write_config_once
+from app.services.sap_service import SAPService
 from app.utils.logger import setup_logger, get_logger
 from app.api.routes import health, xyz_write, dynamic_segmentation  # REMOVED xyz_analysis
 
@@ -25,6 +29,39 @@ settings = get_settings()
 setup_logger("app", level=settings.LOG_LEVEL, format_type=settings.LOG_FORMAT)
 logger = get_logger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown; shared resources are built once here"""
+    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
+    
+    # Dedicated pool for blocking SAP calls so they don't contend with FastAPI's default executor
+    app.state.sap_executor = ThreadPoolExecutor(
+        max_workers=settings.DEFAULT_MAX_WORKERS * 2,
+        thread_name_prefix="sap-io"
+    )
+    
+    # Build services once; dependencies read them from app.state
+    app.state.sap_service = SAPService()
+    app.state.sap_write_service, app.state.write_config_error = validate_write_config_once(settings)
+
+    logger.info(f"Debug mode: {settings.DEBUG}")
+    logger.info(f"Write operations enabled: {settings.ENABLE_WRITE_OPERATIONS}")
+    logger.info("Dynamic segmentation with flexible primary keys enabled")
+    
+    if settings.ENABLE_WRITE_OPERATIONS:
+        logger.info(f"Write API URL: {settings.SAP_WRITE_API_URL}")
+        logger.info(f"Planning Area: {settings.SAP_PLANNING_AREA}")
+        logger.info(f"XYZ Key Figure: {settings.SAP_XYZ_KEY_FIGURE}")
+    
+    yield
+    
+    logger.info("Shutting down application")
+    app.state.sap_executor.shutdown(wait=False)
+    if app.state.sap_write_service is not None:
+        app.state.sap_write_service.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
@@ -79,7 +116,9 @@ app = FastAPI(
     | Customer-Product | CUSTID | ["CUSTID", "PRDID"] |
     """,
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -97,26 +136,6 @@ app.include_router(dynamic_segmentation.router)
 app.include_router(xyz_write.router)
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Application startup"""
-    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
-    logger.info(f"Debug mode: {settings.DEBUG}")
-    logger.info(f"Write operations enabled: {settings.ENABLE_WRITE_OPERATIONS}")
-    logger.info("Dynamic segmentation with flexible primary keys enabled")
-    
-    if settings.ENABLE_WRITE_OPERATIONS:
-        logger.info(f"Write API URL: {settings.SAP_WRITE_API_URL}")
-        logger.info(f"Planning Area: {settings.SAP_PLANNING_AREA}")
-        logger.info(f"XYZ Key Figure: {settings.SAP_XYZ_KEY_FIGURE}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Application shutdown"""
-    logger.info("Shutting down application")
-
-
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
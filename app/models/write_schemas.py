@@ -1,5 +1,13 @@
 from pydantic import BaseModel, Field
 from typing import Optional, Dict, List, Any
+from enum import Enum
+
+
+class WriteMode(str, Enum):
+    """Write mode options"""
+    SIMPLE = "simple"
+    BATCHED = "batched"
+    PARALLEL = "parallel"
 
 
 class XYZWriteRequest(BaseModel):
@@ -15,7 +23,7 @@ class XYZWriteRequest(BaseModel):
     filters: Optional[str] = Field(None, description="Additional OData filters for data fetch")
     
     # Write parameters
-    write_mode: str = Field("simple", description="Write mode: simple, batched, or parallel")
+    write_mode: WriteMode = Field(WriteMode.SIMPLE, description="Write mode: simple, batched, or parallel")
     version_id: Optional[str] = Field(None, description="Target version ID (None = base version)")
     scenario_id: Optional[str] = Field(None, description="Target scenario ID (None = baseline)")
     location_id: Optional[str] = Field(None, description="Location ID if location-specific")
@@ -16,10 +16,21 @@ from app.models.segmentation_schemas import SegmentationConfig
 
 logger = get_logger(__name__)
 
+# Fixed segment domain; categorical codes 0/1/2 map to X/Y/Z, -1 marks anything else
+XYZ_SEGMENTS = ['X', 'Y', 'Z']
+XYZ_SEGMENT_DTYPE = pd.CategoricalDtype(categories=XYZ_SEGMENTS)
+
 
 class DynamicAnalysisService:
     """Service for performing dynamic XYZ segmentation analysis"""
     
+    @staticmethod
+    def count_segments(segments: pd.Series) -> Dict[str, int]:
+        """Count X/Y/Z segments with a single bincount over categorical codes"""
+        codes = pd.Categorical(segments, dtype=XYZ_SEGMENT_DTYPE).codes
+        counts = np.bincount(codes[codes >= 0], minlength=len(XYZ_SEGMENTS))
+        return {segment: int(count) for segment, count in zip(XYZ_SEGMENTS, counts)}
+    
     @staticmethod
     def get_recommended_combinations(df: pd.DataFrame, attributes: List[str]) -> List[dict]:
         """Generate recommended attribute combinations based on data"""
@@ -203,12 +214,13 @@ class DynamicAnalysisService:
             ((group_stats['CV'] > config.x_threshold) & (group_stats['CV'] <= config.y_threshold)),
             (group_stats['CV'] > config.y_threshold)
         ]
-        choices = ['X', 'Y', 'Z']
         
-        group_stats['XYZ_Segment'] = np.select(conditions, choices, default='Unknown')
+        # Select categorical codes (0/1/2 -> X/Y/Z) so the segment column is stored as int8 codes
+        codes = np.select(conditions, range(len(XYZ_SEGMENTS)), default=-1)
+        group_stats['XYZ_Segment'] = pd.Categorical.from_codes(codes, dtype=XYZ_SEGMENT_DTYPE)
         
         # Calculate data quality metrics
-        segment_counts = group_stats['XYZ_Segment'].value_counts().to_dict()
+        segment_counts = DynamicAnalysisService.count_segments(group_stats['XYZ_Segment'])
         
         data_quality = {
             'total_records_analyzed': len(df),
@@ -4,18 +4,271 @@ app/services/sap_write_service.py - Complete version with all write modes
 This is the COMPLETE file - replace your existing sap_write_service.py with this
 """
 
+import asyncio
+import multiprocessing
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
-from typing import Optional, Dict, List, Any
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Optional, Dict, List, Any, Iterable, Union
 from datetime import datetime
+import queue
+import threading
+import time
 import uuid
+import random
+import gzip
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+import orjson
 from app.config import get_settings
 from app.utils.logger import get_logger
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow is optional; Arrow tables are only accepted when it is installed
+    pa = None
+    pc = None
+
 logger = get_logger(__name__)
 
+# orjson options for write payloads; numpy scalars left behind by pandas are encoded natively
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
+# Write payloads repeat every field name per record; level 1 already shrinks them several
+# times over at a fraction of the CPU cost of higher levels
+GZIP_COMPRESS_LEVEL = 1
+
+# Transient SAP gateway failures are retried with exponential backoff
+# (backoff * 2 ** attempt) instead of failing the whole write
+RETRY_TOTAL = 5
+RETRY_BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Longest Retry-After (seconds) honoured between batch retries
+RETRY_AFTER_MAX = 30.0
+
+
+def _encode_json(payload: Dict[str, Any]) -> bytes:
+    """Serialize a request payload to JSON bytes with orjson"""
+    return orjson.dumps(payload, option=ORJSON_OPTIONS)
+
+
+# Segment data may be a pandas DataFrame or, when pyarrow is installed, a pyarrow.Table
+SegmentData = Union[pd.DataFrame, "pa.Table"]
+
+
+def _is_arrow_table(data: Any) -> bool:
+    return pa is not None and isinstance(data, pa.Table)
+
+
+def _column_names(data: SegmentData) -> List[str]:
+    return data.column_names if _is_arrow_table(data) else list(data.columns)
+
+
+def _slice_rows(data: SegmentData, start: int, stop: int) -> SegmentData:
+    """Positional row slice: zero-copy Table.slice for Arrow, an iloc view for pandas"""
+    if _is_arrow_table(data):
+        return data.slice(start, stop - start)
+    return data.iloc[start:stop]
+
+
+def _concat_rows(chunks: List[SegmentData]) -> SegmentData:
+    if _is_arrow_table(chunks[0]):
+        return pa.concat_tables(chunks)
+    return pd.concat(chunks)
+
+
+def _str_values(values: pd.Series) -> np.ndarray:
+    """Column values as strings, like astype(str), in an object array"""
+    # A categorical of strings (the XYZ segments) only converts its few categories;
+    # the rows reuse those string objects through their codes instead of each getting
+    # a fresh str, and a missing value (code -1) picks the trailing "nan", the string
+    # astype(str) produces for it under the pinned pandas 2.1. Numeric categories
+    # keep astype(str), whose formatting depends on whether values are missing
+    if (isinstance(values.dtype, pd.CategoricalDtype)
+            and pd.api.types.is_string_dtype(values.cat.categories)):
+        labels = np.empty(len(values.cat.categories) + 1, dtype=object)
+        labels[:-1] = values.cat.categories.astype(str)
+        labels[-1] = "nan"
+        return labels[values.cat.codes.to_numpy()]
+    return values.astype(str).to_numpy()
+
+
+def _dataframe_nav_values(
+    segment_data: pd.DataFrame,
+    dimension_order: List[str],
+    key_cols: List[str],
+    period_field: str
+) -> tuple[Dict[str, np.ndarray], Dict[str, np.ndarray], np.ndarray, Any]:
+    """Extract (dimension arrays, missing dimension masks, segments, periods) from a DataFrame"""
+    # One record per planning-level key (dimensions + period); the last occurrence wins
+    deduplicated = segment_data.drop_duplicates(subset=key_cols, keep='last')
+    if len(deduplicated) < len(segment_data):
+        logger.debug("Dropped %d duplicate records on %s", len(segment_data) - len(deduplicated), key_cols)
+        segment_data = deduplicated
+    
+    dimensions = {}
+    missing_dims = {}
+    for dim in dimension_order:
+        values = segment_data[dim]
+        missing = values.isna().to_numpy()
+        if missing.any():
+            missing_dims[dim] = missing
+        dimensions[dim] = _str_values(values)
+    
+    segments = _str_values(segment_data['XYZ_Segment'])
+    
+    # Period field: append midnight to plain dates, default missing periods to now.
+    # "now" is formatted once per call, and only when some period is missing
+    if period_field not in segment_data.columns:
+        return dimensions, missing_dims, segments, _utc_now_timestamp()
+    
+    periods = segment_data[period_field]
+    missing_periods = periods.isna()
+    if pd.api.types.is_datetime64_any_dtype(periods):
+        timestamps = periods.dt.strftime("%Y-%m-%dT%H:%M:%S")
+    else:
+        timestamps = periods.astype(str)
+    timestamps = timestamps.where(timestamps.str.contains('T', regex=False), timestamps + "T00:00:00")
+    if missing_periods.any():
+        timestamps = timestamps.mask(missing_periods, _utc_now_timestamp())
+    return dimensions, missing_dims, segments, timestamps.to_numpy()
+
+
+def _arrow_str_values(column: "pa.ChunkedArray") -> np.ndarray:
+    """Arrow column values as strings, formatted the way _str_values formats them in pandas"""
+    # Arrow casts strings and integers to the same text as pandas; floats ("1720" vs
+    # "1720.0"), booleans and other types go through pandas so both inputs produce
+    # the same payload
+    kind = column.type
+    if pa.types.is_dictionary(kind):
+        kind = kind.value_type
+    if pa.types.is_string(kind) or pa.types.is_large_string(kind) or pa.types.is_integer(kind):
+        return pc.cast(column, pa.string()).to_numpy(zero_copy_only=False)
+    return _str_values(column.to_pandas())
+
+
+def _arrow_nav_values(
+    table: "pa.Table",
+    dimension_order: List[str],
+    key_cols: List[str],
+    period_field: str
+) -> tuple[Dict[str, np.ndarray], Dict[str, np.ndarray], np.ndarray, Any]:
+    """Arrow counterpart of _dataframe_nav_values; only the key columns go through pandas"""
+    duplicated = table.select(key_cols).to_pandas().duplicated(keep='last').to_numpy()
+    if duplicated.any():
+        logger.debug("Dropped %d duplicate records on %s", int(duplicated.sum()), key_cols)
+        table = table.filter(pa.array(~duplicated))
+    
+    dimensions = {}
+    missing_dims = {}
+    for dim in dimension_order:
+        column = table.column(dim)
+        if column.null_count:
+            missing_dims[dim] = column.is_null().to_numpy()
+        dimensions[dim] = _arrow_str_values(column)
+    
+    segments = _arrow_str_values(table.column('XYZ_Segment'))
+    
+    if period_field not in table.column_names:
+        return dimensions, missing_dims, segments, _utc_now_timestamp()
+    
+    periods = table.column(period_field)
+    if pa.types.is_timestamp(periods.type):
+        seconds = pc.cast(periods, pa.timestamp("s", periods.type.tz), safe=False)
+        timestamps = pc.strftime(seconds, "%Y-%m-%dT%H:%M:%S")
+    else:
+        timestamps = pc.cast(periods, pa.string())
+    timestamps = pc.if_else(
+        pc.match_substring(timestamps, "T"),
+        timestamps,
+        pc.binary_join_element_wise(timestamps, "T00:00:00", "")
+    )
+    if periods.null_count:
+        timestamps = pc.fill_null(timestamps, _utc_now_timestamp())
+    return dimensions, missing_dims, segments, timestamps.to_numpy()
+
+
+def _utc_now_timestamp() -> str:
+    """Current UTC time in the SAP period timestamp format"""
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _encode_string_column(values: np.ndarray, blank_mask: Optional[np.ndarray]) -> tuple[List[bytes], bool]:
+    """
+    Encode a column to per-row JSON fragments with a single orjson call
+    
+    Returns (fragments, quoted). For an all-string column without escapes the encoded
+    list is split on its '","' separators and the fragments come back without their
+    surrounding quotes. An escaped quote (a value ending in '",' encodes as '\\",')
+    would look like a separator, so any backslash in the output, like any non-string
+    value, falls back to encoding each value on its own. Rows set in blank_mask hold
+    values that are discarded later; they are blanked so a missing value does not
+    force the slow path.
+    """
+    if blank_mask is not None:
+        values = np.where(blank_mask, "", values)
+    items = values.tolist()
+    
+    encoded = orjson.dumps(items, option=ORJSON_OPTIONS)
+    # Without a backslash nothing is escaped, so every '"' is a string delimiter
+    if encoded.startswith(b'["') and encoded.endswith(b'"]') and b"\\" not in encoded:
+        fragments = encoded[2:-2].split(b'","')
+        if len(fragments) == len(items):
+            return fragments, True
+    
+    return [orjson.dumps(value, option=ORJSON_OPTIONS) for value in items], False
+
+
+def _encode_nav_records(
+    nav_columns: Dict[str, Any],
+    missing_dims: Dict[str, np.ndarray],
+    row_count: int
+) -> bytes:
+    """
+    Encode navigation records as a JSON array, one bytes fragment per row
+    
+    The record layout is specialized once per payload into a %-template with keys
+    and shared scalar values baked in, so each row is a single branch-free format
+    of its pre-encoded column fragments. Rows with missing dimensions are encoded
+    individually so those keys are left out.
+    """
+    if row_count == 0:
+        return b"[]"
+    
+    fields = []
+    encoded_columns = []
+    for name, values in nav_columns.items():
+        key = orjson.dumps(name).replace(b"%", b"%%")
+        if isinstance(values, np.ndarray):
+            fragments, quoted = _encode_string_column(values, missing_dims.get(name))
+            fields.append(key + (b':"%b"' if quoted else b":%b"))
+            encoded_columns.append(fragments)
+        else:
+            fields.append(key + b":" + orjson.dumps(values, option=ORJSON_OPTIONS).replace(b"%", b"%%"))
+    template = b"{" + b",".join(fields) + b"}"
+    
+    rows = list(map(template.__mod__, zip(*encoded_columns)))
+    
+    if missing_dims:
+        # Rows missing any dimension, from the column masks combined once
+        any_missing = np.logical_or.reduce(list(missing_dims.values()))
+        for row in any_missing.nonzero()[0]:
+            record = {
+                name: values[row] if isinstance(values, np.ndarray) else values
+                for name, values in nav_columns.items()
+                if not (name in missing_dims and missing_dims[name][row])
+            }
+            rows[row] = orjson.dumps(record, option=ORJSON_OPTIONS)
+    
+    return b"[" + b",".join(rows) + b"]"
+
 
 class SAPWriteService:
     """Service for writing data back to SAP IBP via PLANNING_DATA_API_SRV"""
@@ -29,20 +282,122 @@ class SAPWriteService:
         self.planning_area = self.settings.SAP_PLANNING_AREA
         self.xyz_key_figure = self.settings.SAP_XYZ_KEY_FIGURE
         self.enable_null_handling = self.settings.SAP_ENABLE_NULL_HANDLING
+        self.compress_requests = self.settings.SAP_COMPRESS_REQUESTS
+        
+        # Headers describing the body produced by _encode_payload
+        self._payload_headers = {"Content-Type": "application/json"}
+        if self.compress_requests:
+            self._payload_headers["Content-Encoding"] = "gzip"
+        
+        # Navigation property name format: Nav{PlanningArea}
+        self._nav_property_name = f"Nav{self.planning_area}"
+        self._nav_key_bytes = orjson.dumps(self._nav_property_name)
+        # AggregationLevelFieldsString per (dimension order, period field, NULL flag) layout
+        self._agg_fields_cache: Dict[tuple, str] = {}
+        
+        # One session for the service lifetime so TCP/TLS connections are reused;
+        # only the CSRF token bound to it is refreshed
+        self._session = self._create_session()
+        self._csrf_lock = threading.Lock()
+        self._csrf_token: Optional[str] = None
+        self._csrf_fetched_at = 0.0
+        
+        # Optional process pool for CPU-bound batch encoding, created on first use
+        self._encode_processes = self.settings.ENCODE_PROCESSES
+        self._encode_pool: Optional[ProcessPoolExecutor] = None
+        self._encode_pool_lock = threading.Lock()
         
         logger.info(f"Initialized write service with URL: {self.api_url}")
         logger.info(f"Planning area: {self.planning_area}")
         logger.info(f"Key figure: {self.xyz_key_figure}")
     
-    def _get_csrf_token(self) -> tuple[requests.Session, str]:
-        """Fetch CSRF token required for POST operations"""
-        logger.debug("Fetching CSRF token from SAP")
+    def _ensure_csrf(self) -> tuple[requests.Session, str]:
+        """
+        Return the shared session and its memoized CSRF token, fetching the token on first use
+        
+        The session lives as long as the service (callers must not close it), so
+        TCP/TLS connections are reused across requests and token refreshes. The token
+        is only refreshed when SAP rejects it (see _post_with_csrf).
+        """
+        csrf_token = self._csrf_token
+        if csrf_token is not None:
+            return self._session, csrf_token
         
+        with self._csrf_lock:
+            if self._csrf_token is None:
+                self._csrf_token = self._fetch_csrf_token()
+                self._csrf_fetched_at = time.monotonic()
+            return self._session, self._csrf_token
+    
+    def _refresh_csrf(self, stale_token: str) -> str:
+        """Replace a CSRF token SAP rejected; callers holding the same stale token share one fetch"""
+        with self._csrf_lock:
+            if self._csrf_token == stale_token:
+                logger.info(f"CSRF token rejected after {time.monotonic() - self._csrf_fetched_at:.0f}s, fetching a new one")
+                self._csrf_token = self._fetch_csrf_token()
+                self._csrf_fetched_at = time.monotonic()
+            return self._csrf_token
+    
+    def _current_csrf(self, csrf_token: str) -> str:
+        """The shared token, which a refresh in _post_with_csrf may have replaced since csrf_token was read"""
+        return self._csrf_token or csrf_token
+    
+    @staticmethod
+    def _csrf_required(response) -> bool:
+        """True when SAP rejected the request for a missing or expired CSRF token"""
+        return (
+            response.status_code == 403
+            and response.headers.get("X-CSRF-Token", "").lower() == "required"
+        )
+    
+    def _post_with_csrf(
+        self,
+        session: requests.Session,
+        url: str,
+        csrf_token: str,
+        headers: Dict[str, str],
+        **kwargs
+    ) -> requests.Response:
+        """POST with the CSRF token; when SAP asks for a new token, refresh it and retry once"""
+        response = session.post(url, headers={**headers, "X-CSRF-Token": csrf_token}, **kwargs)
+        if self._csrf_required(response):
+            csrf_token = self._refresh_csrf(csrf_token)
+            response = session.post(url, headers={**headers, "X-CSRF-Token": csrf_token}, **kwargs)
+        return response
+    
+    def _create_session(self) -> requests.Session:
+        """Create an authenticated session with a pooled HTTP adapter"""
         session = requests.Session()
         session.auth = (self.username, self.password)
         
+        # One pooled connection per sap-io executor thread (DEFAULT_MAX_WORKERS * 2), so
+        # concurrent requests never open throwaway connections beyond the pool
+        max_workers = self.settings.DEFAULT_MAX_WORKERS
+        retry = Retry(
+            total=RETRY_TOTAL,
+            backoff_factor=RETRY_BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "HEAD", "POST"]),
+            # A read error or timeout means SAP may already have the request; re-sending
+            # a POST would duplicate the write, so only connect errors and statuses retry
+            read=0,
+            other=0,
+            respect_retry_after_header=True,
+            # Hand the final error response back so raise_for_status() reports it as before
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers * 2, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+    
+    def _fetch_csrf_token(self) -> str:
+        """Fetch CSRF token required for POST operations on the shared session"""
+        logger.debug("Fetching CSRF token from SAP")
+        
         try:
-            response = session.get(
+            # HEAD: only the X-CSRF-Token header is needed, not the service document
+            response = self._session.head(
                 self.api_url,
                 headers={
                     "X-CSRF-Token": "Fetch",
@@ -58,106 +413,159 @@ class SAPWriteService:
                 raise Exception("CSRF token not found in response headers")
             
             logger.info(f"CSRF token obtained successfully")
-            return session, csrf_token
+            return csrf_token
             
         except Exception as e:
             logger.error(f"Failed to get CSRF token: {str(e)}")
             raise Exception(f"Failed to obtain CSRF token: {str(e)}")
     
+    def __getstate__(self) -> Dict[str, Any]:
+        # Encoder processes receive the service with the payload-building state only;
+        # the session, locks and pools stay in the parent
+        state = self.__dict__.copy()
+        for name in ("_session", "_csrf_lock", "_csrf_token", "_encode_pool", "_encode_pool_lock"):
+            state.pop(name, None)
+        return state
+    
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._session = None
+        self._csrf_lock = threading.Lock()
+        self._csrf_token = None
+        self._encode_pool = None
+        self._encode_pool_lock = threading.Lock()
+    
+    def close(self) -> None:
+        """Close the shared session and its pooled connections, and stop any encoder processes"""
+        with self._csrf_lock:
+            self._csrf_token = None
+        with self._encode_pool_lock:
+            pool, self._encode_pool = self._encode_pool, None
+        self._session.close()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    async def _encode_off_loop(self, **kwargs) -> bytes:
+        """
+        Run _encode_payload away from the event loop
+        
+        With ENCODE_PROCESSES > 0 batches are encoded in a process pool, so the pandas
+        work that holds the GIL runs on separate cores; otherwise in a worker thread.
+        """
+        encode = partial(self._encode_payload, **kwargs)
+        if self._encode_processes <= 0:
+            return await asyncio.to_thread(encode)
+        
+        with self._encode_pool_lock:
+            if self._encode_pool is None:
+                # spawn: forking a process that runs server and executor threads is unsafe
+                self._encode_pool = ProcessPoolExecutor(
+                    max_workers=self._encode_processes,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            pool = self._encode_pool
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, encode)
+        except BrokenProcessPool:
+            # A dead worker breaks the whole pool; drop it so the next write starts a fresh one
+            with self._encode_pool_lock:
+                if self._encode_pool is pool:
+                    self._encode_pool = None
+            raise
+    
     def _generate_transaction_id(self) -> str:
         """Generate a unique transaction ID"""
         return uuid.uuid4().hex.upper()[:32]
     
-    def _prepare_payload(
+    def _build_nav_columns(
         self,
-        segment_data: pd.DataFrame,
-        transaction_id: str,
-        primary_key: str = "PRDID",
-        version_id: Optional[str] = None,
-        scenario_id: Optional[str] = None,
-        period_field: str = "PERIODID3_TSTAMP",
-        do_commit: bool = False
-    ) -> Dict[str, Any]:
+        segment_data: SegmentData,
+        primary_key: str,
+        period_field: str
+    ) -> tuple[str, Dict[str, Any], Dict[str, np.ndarray]]:
         """
-        Prepare POST payload for SAP IBP with flexible primary key
+        Build AggregationLevelFieldsString and the navigation property columns
         
-        FIXED: Added validation and proper timestamp formatting
+        Returns (agg_fields, nav_columns, missing_dims). nav_columns maps each field,
+        in AggregationLevelFieldsString order, to an array of values or a scalar shared
+        by every row; missing_dims maps a dimension to its boolean missing-value mask
+        (only dimensions with missing values are present).
         """
-        logger.debug(f"Preparing payload for {len(segment_data)} records with primary_key={primary_key}")
+        columns = _column_names(segment_data)
         
         # Validate that primary_key exists in data
-        if primary_key not in segment_data.columns:
-            raise ValueError(f"Primary key {primary_key} not found in segment_data. Available: {list(segment_data.columns)}")
+        if primary_key not in columns:
+            raise ValueError(f"Primary key {primary_key} not found in segment_data. Available: {columns}")
         
         # Identify all dimension columns (everything except XYZ_Segment and period)
-        dimension_cols = [col for col in segment_data.columns 
+        dimension_cols = [col for col in columns 
                          if col not in ['XYZ_Segment', period_field, 'mean', 'std', 'CV', 'count']]
         
-        logger.info(f"Dimension columns identified: {dimension_cols}")
+        # Dimensions in AggregationLevelFieldsString order: primary_key first, then others
+        dimension_order = [primary_key] + [dim for dim in dimension_cols if dim != primary_key]
+        agg_fields = self._agg_fields(tuple(dimension_order), period_field)
+        
+        key_cols = dimension_order + ([period_field] if period_field in columns else [])
+        extract = _arrow_nav_values if _is_arrow_table(segment_data) else _dataframe_nav_values
+        dimensions, missing_dims, segments, timestamps = extract(
+            segment_data, dimension_order, key_cols, period_field
+        )
+        
+        # Navigation property data column-wise, in the same field order as
+        # AggregationLevelFieldsString: dimensions, key figure, NULL flag, period.
+        # Keys must be the entity's OData property names (the API has no aliasing),
+        # so their per-record repetition is left to gzip (SAP_COMPRESS_REQUESTS)
+        nav_columns = dict(dimensions)
+        nav_columns[self.xyz_key_figure] = segments
+        
+        # NULL flag (always required per SAP OData API)
+        nav_columns[f"{self.xyz_key_figure}_isNull"] = False
+        
+        nav_columns[period_field] = timestamps
+        
+        return agg_fields, nav_columns, missing_dims
+    
+    def _agg_fields(self, dimension_order: tuple, period_field: str) -> str:
+        """Return AggregationLevelFieldsString for a dimension layout, built once per layout"""
+        cache_key = (dimension_order, period_field, self.enable_null_handling)
+        agg_fields = self._agg_fields_cache.get(cache_key)
+        if agg_fields is not None:
+            return agg_fields
+        
+        logger.info(f"Dimension columns identified: {list(dimension_order)}")
         
         # Build AggregationLevelFieldsString per SAP format
         # Order: Dimensions -> Key Figure -> (NULL Flag if enabled) -> Period
-        agg_fields_list = []
-        
-        # 1. Add all dimensions (in order: primary_key first, then others)
-        agg_fields_list.append(primary_key)
-        for dim in dimension_cols:
-            if dim != primary_key:
-                agg_fields_list.append(dim)
+        agg_fields_list = list(dimension_order)
         
-        # 2. Add key figure
+        # Add key figure
         agg_fields_list.append(self.xyz_key_figure)
         
-        # 3. Add NULL flag only if enabled
+        # Add NULL flag only if enabled
         if self.enable_null_handling:
             agg_fields_list.append(f"{self.xyz_key_figure}_isNull")
         
-        # 4. Add period field last
+        # Add period field last
         agg_fields_list.append(period_field)
         
         agg_fields = ','.join(agg_fields_list)
         logger.info(f"AggregationLevelFieldsString: {agg_fields}")
         
-        # Build navigation property data
-        nav_data = []
-        for idx, row in segment_data.iterrows():
-            record = {}
-            
-            # Add fields in same order as AggregationLevelFieldsString
-            # 1. Dimensions (primary_key first, then others)
-            if primary_key in row.index and pd.notna(row[primary_key]):
-                record[primary_key] = str(row[primary_key])
-            
-            for dim in dimension_cols:
-                if dim != primary_key and dim in row.index and pd.notna(row[dim]):
-                    record[dim] = str(row[dim])
-            
-            # 2. Key figure (XYZ segment value)
-            record[self.xyz_key_figure] = str(row['XYZ_Segment'])
-            
-            # 3. NULL flag (always required per SAP OData API)
-            record[f"{self.xyz_key_figure}_isNull"] = False
-            
-            # 4. Period field
-            if period_field in row.index and pd.notna(row[period_field]):
-                timestamp_str = str(row[period_field])
-                if 'T' not in timestamp_str:
-                    timestamp_str = f"{timestamp_str}T00:00:00"
-                record[period_field] = timestamp_str
-            else:
-                record[period_field] = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
-            
-            nav_data.append(record)
-        
-        # Navigation property name format: Nav{PlanningArea}
-        nav_property_name = f"Nav{self.planning_area}"
-        logger.info(f"Navigation property name: {nav_property_name}")
-        
-        # Build main payload
+        self._agg_fields_cache[cache_key] = agg_fields
+        return agg_fields
+    
+    def _payload_envelope(
+        self,
+        transaction_id: str,
+        agg_fields: str,
+        version_id: Optional[str],
+        scenario_id: Optional[str],
+        do_commit: bool
+    ) -> Dict[str, Any]:
+        """Build the payload fields that wrap the navigation property records"""
         payload = {
             "Transactionid": transaction_id,
-            "AggregationLevelFieldsString": agg_fields,
-            nav_property_name: nav_data
+            "AggregationLevelFieldsString": agg_fields
         }
         
         if version_id:
@@ -169,8 +577,42 @@ class SAPWriteService:
         if do_commit:
             payload["DoCommit"] = True
         
-        logger.debug(f"Payload prepared: {len(nav_data)} records")
-        logger.debug(f"Sample record: {nav_data[0] if nav_data else 'None'}")
+        return payload
+    
+    def _prepare_payload(
+        self,
+        segment_data: SegmentData,
+        transaction_id: str,
+        primary_key: str = "PRDID",
+        version_id: Optional[str] = None,
+        scenario_id: Optional[str] = None,
+        period_field: str = "PERIODID3_TSTAMP",
+        do_commit: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Prepare POST payload for SAP IBP with flexible primary key
+        
+        FIXED: Added validation and proper timestamp formatting
+        """
+        logger.debug("Preparing payload for %d records with primary_key=%s", len(segment_data), primary_key)
+        
+        agg_fields, nav_columns, missing_dims = self._build_nav_columns(segment_data, primary_key, period_field)
+        
+        # Row count after deduplication, from the primary key column
+        row_count = len(nav_columns[primary_key])
+        nav_data = pd.DataFrame(nav_columns, index=range(row_count)).to_dict(orient='records')
+        
+        # Dimensions are omitted (not sent as "nan") on rows where they are missing
+        for dim, missing in missing_dims.items():
+            for row in missing.nonzero()[0]:
+                del nav_data[row][dim]
+        
+        # Build main payload
+        payload = self._payload_envelope(transaction_id, agg_fields, version_id, scenario_id, do_commit)
+        payload[self._nav_property_name] = nav_data
+        
+        logger.debug("Payload prepared: %d records", len(nav_data))
+        logger.debug("Sample record: %s", nav_data[0] if nav_data else None)
         
         # ADDED: Log first 2 complete records for debugging
         logger.info(f"First record details: {json.dumps(nav_data[0], indent=2) if nav_data else 'None'}")
@@ -179,9 +621,48 @@ class SAPWriteService:
         
         return payload
     
+    def _encode_payload(
+        self,
+        segment_data: SegmentData,
+        transaction_id: str,
+        primary_key: str = "PRDID",
+        version_id: Optional[str] = None,
+        scenario_id: Optional[str] = None,
+        period_field: str = "PERIODID3_TSTAMP",
+        do_commit: bool = False
+    ) -> bytes:
+        """
+        Encode the POST payload straight to JSON bytes
+        
+        Same content as _prepare_payload, but the navigation records are written
+        from the column arrays without building an intermediate list of dicts.
+        The result is gzip-compressed when SAP_COMPRESS_REQUESTS is enabled; send
+        it with self._payload_headers.
+        """
+        logger.debug("Encoding payload for %d records with primary_key=%s", len(segment_data), primary_key)
+        
+        agg_fields, nav_columns, missing_dims = self._build_nav_columns(segment_data, primary_key, period_field)
+        # Row count after deduplication, from the primary key column
+        row_count = len(nav_columns[primary_key])
+        nav_bytes = _encode_nav_records(nav_columns, missing_dims, row_count)
+        
+        # Splice the encoded records into the envelope as the last property
+        envelope = _encode_json(
+            self._payload_envelope(transaction_id, agg_fields, version_id, scenario_id, do_commit)
+        )
+        body = b"".join((envelope[:-1], b",", self._nav_key_bytes, b":", nav_bytes, b"}"))
+        
+        if self.compress_requests:
+            compressed = gzip.compress(body, compresslevel=GZIP_COMPRESS_LEVEL)
+            logger.debug("Payload encoded: %d records, %d bytes, %d gzipped", row_count, len(body), len(compressed))
+            return compressed
+        
+        logger.debug("Payload encoded: %d records, %d bytes", row_count, len(body))
+        return body
+    
     def write_segments_simple(
         self,
-        segment_data: pd.DataFrame,
+        segment_data: SegmentData,
         primary_key: str = "PRDID",
         version_id: Optional[str] = None,
         scenario_id: Optional[str] = None,
@@ -203,7 +684,7 @@ class SAPWriteService:
         logger.info(f"Generated transaction ID: {transaction_id}")
         
         # Prepare payload
-        payload = self._prepare_payload(
+        body = self._encode_payload(
             segment_data=segment_data,
             transaction_id=transaction_id,
             primary_key=primary_key,
@@ -214,14 +695,19 @@ class SAPWriteService:
         )
         
         # ADDED: Log complete payload structure (first record only for brevity)
-        payload_sample = payload.copy()
-        nav_key = f"Nav{self.planning_area}"
-        if nav_key in payload_sample and len(payload_sample[nav_key]) > 2:
-            payload_sample[nav_key] = payload_sample[nav_key][:2]  # Only first 2 records
+        payload_sample = self._prepare_payload(
+            segment_data=_slice_rows(segment_data, 0, 2),
+            transaction_id=transaction_id,
+            primary_key=primary_key,
+            version_id=version_id,
+            scenario_id=scenario_id,
+            period_field=period_field,
+            do_commit=True
+        )
         logger.info(f"Complete payload structure:\n{json.dumps(payload_sample, indent=2)}")
         
         # Get CSRF token
-        session, csrf_token = self._get_csrf_token()
+        session, csrf_token = self._ensure_csrf()
         
         # Send POST request
         url = f"{self.api_url}/{self.planning_area}Trans"
@@ -230,14 +716,15 @@ class SAPWriteService:
             logger.info(f"Sending POST to: {url}")
             logger.info(f"Request headers: Content-Type=application/json, X-CSRF-Token={csrf_token[:10]}...")
             
-            response = session.post(
+            response = self._post_with_csrf(
+                session,
                 url,
-                json=payload,
+                csrf_token,
                 headers={
-                    "Content-Type": "application/json",
-                    "X-CSRF-Token": csrf_token,
+                    **self._payload_headers,
                     "Accept": "application/json"
                 },
+                data=body,
                 timeout=self.timeout
             )
             
@@ -272,13 +759,10 @@ class SAPWriteService:
                     pass
             
             raise Exception(f"Failed to write data to SAP: {str(e)}")
-        
-        finally:
-            session.close()
     
     def write_segments_batched(
         self,
-        segment_data: pd.DataFrame,
+        segment_data: SegmentData,
         primary_key: str = "PRDID",
         version_id: Optional[str] = None,
         scenario_id: Optional[str] = None,
@@ -289,7 +773,7 @@ class SAPWriteService:
         Write XYZ segments using multi-batch method with explicit commit
         
         Args:
-            segment_data: DataFrame with primary_key and XYZ_Segment columns
+            segment_data: DataFrame or pyarrow.Table with primary_key and XYZ_Segment columns
             primary_key: Primary key field
             version_id: Target version
             scenario_id: Target scenario
@@ -303,77 +787,115 @@ class SAPWriteService:
         logger.info(f"Starting batched write for {record_count} segments with primary_key={primary_key}")
         
         # Get CSRF token and session
-        session, csrf_token = self._get_csrf_token()
+        session, csrf_token = self._ensure_csrf()
         
+        # Generate transaction ID locally (similar to simple mode)
+        transaction_id = self._generate_transaction_id()
+        logger.info(f"Generated transaction ID: {transaction_id}")
+        
+        # Split data into batches
+        batches = [_slice_rows(segment_data, i, i + batch_size) for i in range(0, record_count, batch_size)]
+        batch_count = len(batches)
+        logger.info(f"Split into {batch_count} batches of max {batch_size} records")
+        
+        url = f"{self.api_url}/{self.planning_area}Trans"
+        
+        # Pipeline: a producer thread encodes batch i+1 while batch i is being POSTed.
+        # The bounded queue keeps at most two encoded bodies waiting.
+        bodies: queue.Queue = queue.Queue(maxsize=2)
+        stop = threading.Event()
+        
+        def put(item) -> bool:
+            # Give up once the sender stopped, so a failed write never leaves this thread blocked
+            while not stop.is_set():
+                try:
+                    bodies.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        def produce() -> None:
+            try:
+                for idx, batch in enumerate(batches, 1):
+                    body = self._encode_payload(
+                        segment_data=batch,
+                        transaction_id=transaction_id,
+                        primary_key=primary_key,
+                        version_id=version_id,
+                        scenario_id=scenario_id,
+                        period_field=period_field,
+                        do_commit=False
+                    )
+                    if not put((idx, len(batch), body)):
+                        return
+                put(None)
+            except Exception as e:
+                put(e)
+        
+        producer = threading.Thread(target=produce, name="sap-batch-encoder", daemon=True)
+        producer.start()
+        
+        # Per-batch logging is DEBUG and gated, so the send loop doesn't format strings
+        # or take the logging lock for every batch
+        debug = logger.isEnabledFor(logging.DEBUG)
+        
+        # Send batches
         try:
-            # Generate transaction ID locally (similar to simple mode)
-            transaction_id = self._generate_transaction_id()
-            logger.info(f"Generated transaction ID: {transaction_id}")
-            
-            # Split data into batches
-            batches = [segment_data[i:i+batch_size] for i in range(0, record_count, batch_size)]
-            batch_count = len(batches)
-            logger.info(f"Split into {batch_count} batches of max {batch_size} records")
-            
-            url = f"{self.api_url}/{self.planning_area}Trans"
-            
-            # Send batches
-            for idx, batch in enumerate(batches, 1):
-                logger.info(f"Sending batch {idx}/{batch_count} ({len(batch)} records)")
+            while True:
+                item = bodies.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
                 
-                payload = self._prepare_payload(
-                    segment_data=batch,
-                    transaction_id=transaction_id,
-                    primary_key=primary_key,
-                    version_id=version_id,
-                    scenario_id=scenario_id,
-                    period_field=period_field,
-                    do_commit=False
-                )
+                idx, batch_len, body = item
+                if debug:
+                    logger.debug("Sending batch %d/%d (%d records)", idx, batch_count, batch_len)
                 
                 try:
-                    response = session.post(
+                    response = self._post_with_csrf(
+                        session,
                         url,
-                        json=payload,
-                        headers={
-                            "Content-Type": "application/json",
-                            "X-CSRF-Token": csrf_token
-                        },
+                        self._current_csrf(csrf_token),
+                        headers=self._payload_headers,
+                        data=body,
                         timeout=self.timeout
                     )
                     response.raise_for_status()
-                    logger.info(f"Batch {idx}/{batch_count} sent successfully")
+                    if debug:
+                        logger.debug("Batch %d/%d sent successfully", idx, batch_count)
                     
                 except requests.exceptions.RequestException as e:
                     logger.error(f"Batch {idx} failed: {str(e)}")
                     raise Exception(f"Failed to send batch {idx}: {str(e)}")
-            
-            # Commit transaction
-            logger.info("All batches sent, committing transaction")
-            commit_result = self._commit_transaction(session, csrf_token, transaction_id)
-            
-            # Get export result
-            export_result = self._get_export_result(session, csrf_token, transaction_id)
-            
-            return {
-                "status": "success",
-                "transaction_id": transaction_id,
-                "records_sent": record_count,
-                "batch_count": batch_count,
-                "batch_size": batch_size,
-                "primary_key": primary_key,
-                "commit_status": commit_result,
-                "export_result": export_result,
-                "message": "Data written and committed in batches"
-            }
-        
         finally:
-            # Close session
-            session.close()
+            stop.set()
+            producer.join()
+        
+        # Commit transaction
+        logger.info("All batches sent, committing transaction")
+        csrf_token = self._current_csrf(csrf_token)
+        commit_result = self._commit_transaction(session, csrf_token, transaction_id)
+        
+        # Get export result
+        export_result = self._get_export_result(session, self._current_csrf(csrf_token), transaction_id)
+        
+        return {
+            "status": "success",
+            "transaction_id": transaction_id,
+            "records_sent": record_count,
+            "batch_count": batch_count,
+            "batch_size": batch_size,
+            "primary_key": primary_key,
+            "commit_status": commit_result,
+            "export_result": export_result,
+            "message": "Data written and committed in batches"
+        }
     
     def write_segments_parallel(
         self,
-        segment_data: pd.DataFrame,
+        segment_data: SegmentData,
         primary_key: str = "PRDID",
         version_id: Optional[str] = None,
         scenario_id: Optional[str] = None,
@@ -384,14 +906,42 @@ class SAPWriteService:
         """
         Write XYZ segments using parallel processing for high volumes
         
+        Synchronous wrapper around write_segments_parallel_async for callers
+        running outside an event loop (e.g. a worker thread).
+        """
+        return asyncio.run(
+            self.write_segments_parallel_async(
+                segment_data=segment_data,
+                primary_key=primary_key,
+                version_id=version_id,
+                scenario_id=scenario_id,
+                period_field=period_field,
+                batch_size=batch_size,
+                max_workers=max_workers
+            )
+        )
+    
+    async def write_segments_parallel_async(
+        self,
+        segment_data: SegmentData,
+        primary_key: str = "PRDID",
+        version_id: Optional[str] = None,
+        scenario_id: Optional[str] = None,
+        period_field: str = "PERIODID3_TSTAMP",
+        batch_size: int = 5000,
+        max_workers: int = 4
+    ) -> Dict[str, Any]:
+        """
+        Write XYZ segments in parallel batches over an HTTP/2 client
+        
         Args:
-            segment_data: DataFrame with primary_key and XYZ_Segment columns
+            segment_data: DataFrame or pyarrow.Table with primary_key and XYZ_Segment columns
             primary_key: Primary key field
             version_id: Target version
             scenario_id: Target scenario
             period_field: Period timestamp field name
             batch_size: Number of records per batch
-            max_workers: Maximum parallel threads
+            max_workers: Maximum concurrent batch requests
             
         Returns:
             Response with transaction ID and status
@@ -399,78 +949,206 @@ class SAPWriteService:
         record_count = len(segment_data)
         logger.info(f"Starting parallel write for {record_count} segments with primary_key={primary_key}")
         
-        # Get CSRF token and session
-        session, csrf_token = self._get_csrf_token()
+        # Token and transaction calls go through requests; keep them off the event loop
+        session, csrf_token = await asyncio.to_thread(self._ensure_csrf)
         
-        try:
-            # Initiate parallel process
-            transaction_id = self._initiate_parallel_process(
-                session=session,
-                csrf_token=csrf_token,
-                version_id=version_id,
-                scenario_id=scenario_id
-            )
-            
-            # Split data into batches
-            batches = [segment_data[i:i+batch_size] for i in range(0, record_count, batch_size)]
-            batch_count = len(batches)
-            logger.info(f"Split into {batch_count} batches for parallel processing")
-            
-            url = f"{self.api_url}/{self.planning_area}Trans"
-            
-            # Send batches in parallel
-            results = []
-            failed_batches = []
+        # Initiate parallel process
+        transaction_id = await asyncio.to_thread(
+            self._initiate_parallel_process,
+            session=session,
+            csrf_token=csrf_token,
+            version_id=version_id,
+            scenario_id=scenario_id
+        )
+        csrf_token = self._current_csrf(csrf_token)
+        
+        # Split data into batches
+        batches = [_slice_rows(segment_data, i, i + batch_size) for i in range(0, record_count, batch_size)]
+        batch_count = len(batches)
+        logger.info(f"Split into {batch_count} batches for parallel processing")
+        
+        url = f"{self.api_url}/{self.planning_area}Trans"
+        
+        # Send batches concurrently on one event loop, bounded by max_workers in-flight requests
+        results, failed_batches = await self._send_batches_async(
+            url=url,
+            batches=batches,
+            transaction_id=transaction_id,
+            session=session,
+            csrf_token=csrf_token,
+            primary_key=primary_key,
+            period_field=period_field,
+            max_workers=max_workers
+        )
+        
+        if failed_batches:
+            logger.error(f"Failed batches: {failed_batches}")
+            raise Exception(f"Some batches failed: {failed_batches}")
+        
+        # Commit transaction
+        logger.info("All batches sent, committing transaction")
+        csrf_token = self._current_csrf(csrf_token)
+        commit_result = await asyncio.to_thread(self._commit_transaction, session, csrf_token, transaction_id)
+        
+        # Get export result
+        export_result = await asyncio.to_thread(self._get_export_result, session, self._current_csrf(csrf_token), transaction_id)
+        
+        return {
+            "status": "success",
+            "transaction_id": transaction_id,
+            "records_sent": record_count,
+            "batch_count": batch_count,
+            "parallel_workers": max_workers,
+            "primary_key": primary_key,
+            "commit_status": commit_result,
+            "export_result": export_result,
+            "message": "Data written in parallel and committed"
+        }
+    
+    async def write_segments_async_batched(
+        self,
+        segment_data: Union[SegmentData, Iterable[SegmentData]],
+        primary_key: str = "PRDID",
+        version_id: Optional[str] = None,
+        scenario_id: Optional[str] = None,
+        period_field: str = "PERIODID3_TSTAMP",
+        batch_size: int = 5000,
+        max_workers: int = 4
+    ) -> Dict[str, Any]:
+        """
+        Write XYZ segments with an asynchronous batcher that coalesces pending chunks
+        
+        Chunks are queued as they are produced; each of max_workers sender coroutines
+        wakes up, takes every chunk that is already waiting (up to batch_size rows),
+        and POSTs them as one batch, so several batches stay in flight while the
+        next ones are being prepared.
+        
+        Args:
+            segment_data: DataFrame or pyarrow.Table, or an iterable of such chunks, with primary_key and XYZ_Segment columns
+            primary_key: Primary key field
+            version_id: Target version
+            scenario_id: Target scenario
+            period_field: Period timestamp field name
+            batch_size: Maximum number of records per coalesced batch
+            max_workers: Number of batches kept in flight
             
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_batch = {
-                    executor.submit(
-                        self._send_batch_parallel,
-                        url,
-                        batch,
-                        transaction_id,
-                        csrf_token,
-                        primary_key,
-                        period_field,
-                        idx
-                    ): idx for idx, batch in enumerate(batches, 1)
-                }
+        Returns:
+            Response with transaction ID, observed batch sizes, and status
+        """
+        chunks = [segment_data] if isinstance(segment_data, pd.DataFrame) or _is_arrow_table(segment_data) else segment_data
+        logger.info(f"Starting async batched write with primary_key={primary_key}, batch_size={batch_size}, workers={max_workers}")
+        
+        session, csrf_token = await asyncio.to_thread(self._ensure_csrf)
+        
+        # Batches of one transaction are posted concurrently, which needs a parallel process
+        transaction_id = await asyncio.to_thread(
+            self._initiate_parallel_process,
+            session=session,
+            csrf_token=csrf_token,
+            version_id=version_id,
+            scenario_id=scenario_id
+        )
+        csrf_token = self._current_csrf(csrf_token)
+        
+        url = f"{self.api_url}/{self.planning_area}Trans"
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_workers * 2)
+        semaphore = asyncio.BoundedSemaphore(max_workers)
+        batch_sizes: List[int] = []
+        failed_batches: List[int] = []
+        
+        async def produce() -> int:
+            record_count = 0
+            for chunk in chunks:
+                # Oversized chunks are split so a single chunk never exceeds batch_size
+                for start in range(0, len(chunk), batch_size):
+                    piece = _slice_rows(chunk, start, start + batch_size)
+                    record_count += len(piece)
+                    await queue.put(piece)
+            for _ in range(max_workers):
+                await queue.put(None)
+            return record_count
+        
+        async def send(client: httpx.AsyncClient) -> None:
+            carry: Optional[SegmentData] = None
+            done = False
+            while not done:
+                first = carry if carry is not None else await queue.get()
+                carry = None
+                if first is None:
+                    break
                 
-                for future in as_completed(future_to_batch):
-                    batch_idx = future_to_batch[future]
+                # Coalesce whatever is already waiting, up to batch_size rows
+                pending = [first]
+                rows = len(first)
+                while rows < batch_size:
                     try:
-                        result = future.result()
-                        results.append(result)
-                        logger.info(f"Batch {batch_idx} completed successfully")
-                    except Exception as e:
-                        logger.error(f"Batch {batch_idx} failed: {str(e)}")
-                        failed_batches.append(batch_idx)
-            
-            if failed_batches:
-                logger.error(f"Failed batches: {failed_batches}")
-                raise Exception(f"Some batches failed: {failed_batches}")
-            
-            # Commit transaction
-            logger.info("All batches sent, committing transaction")
-            commit_result = self._commit_transaction(session, csrf_token, transaction_id)
-            
-            # Get export result
-            export_result = self._get_export_result(session, csrf_token, transaction_id)
-            
-            return {
-                "status": "success",
-                "transaction_id": transaction_id,
-                "records_sent": record_count,
-                "batch_count": batch_count,
-                "parallel_workers": max_workers,
-                "primary_key": primary_key,
-                "commit_status": commit_result,
-                "export_result": export_result,
-                "message": "Data written in parallel and committed"
-            }
+                        chunk = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+                    if chunk is None:
+                        done = True
+                        break
+                    if rows + len(chunk) > batch_size:
+                        carry = chunk
+                        break
+                    pending.append(chunk)
+                    rows += len(chunk)
+                
+                batch_sizes.append(rows)
+                batch_idx = len(batch_sizes)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Coalesced batch %d: %d records from %d chunks", batch_idx, rows, len(pending))
+                
+                try:
+                    batch = pending[0] if len(pending) == 1 else _concat_rows(pending)
+                    await self._send_batch_parallel(
+                        client, semaphore, url, batch, transaction_id,
+                        csrf_token, primary_key, period_field, batch_idx
+                    )
+                except Exception as e:
+                    logger.error(f"Batch {batch_idx} failed: {str(e)}")
+                    failed_batches.append(batch_idx)
         
-        finally:
-            session.close()
+        try:
+            async with self._async_client(session, max_workers) as client:
+                # The first failure cancels the other tasks, so no sender is left waiting
+                # on a queue the producer will never finish
+                async with asyncio.TaskGroup() as tasks:
+                    producer = tasks.create_task(produce())
+                    for _ in range(max_workers):
+                        tasks.create_task(send(client))
+        except Exception as e:
+            error = e.exceptions[0] if isinstance(e, ExceptionGroup) else e
+            logger.error(f"Async batched write aborted, transaction {transaction_id} not committed: {str(error)}")
+            raise Exception(f"Async batched write failed for transaction {transaction_id}: {str(error)}") from error
+        record_count = producer.result()
+        
+        logger.info(f"Observed batch sizes: {batch_sizes}")
+        
+        if failed_batches:
+            logger.error(f"Failed batches: {sorted(failed_batches)}")
+            raise Exception(f"Some batches failed: {sorted(failed_batches)}")
+        
+        # Commit transaction
+        logger.info("All batches sent, committing transaction")
+        csrf_token = self._current_csrf(csrf_token)
+        commit_result = await asyncio.to_thread(self._commit_transaction, session, csrf_token, transaction_id)
+        
+        # Get export result
+        export_result = await asyncio.to_thread(self._get_export_result, session, self._current_csrf(csrf_token), transaction_id)
+        
+        return {
+            "status": "success",
+            "transaction_id": transaction_id,
+            "records_sent": record_count,
+            "batch_count": len(batch_sizes),
+            "batch_sizes": batch_sizes,
+            "parallel_workers": max_workers,
+            "primary_key": primary_key,
+            "commit_status": commit_result,
+            "export_result": export_result,
+            "message": "Data written in coalesced async batches and committed"
+        }
     
     def _get_transaction_id(self, session: requests.Session, csrf_token: str) -> str:
         """Get transaction ID from SAP system"""
@@ -478,11 +1156,12 @@ class SAPWriteService:
 
         try:
             logger.debug(f"Requesting transaction ID from SAP with URL: {url}")
-            response = session.post(
+            response = self._post_with_csrf(
+                session,
                 url,
+                csrf_token,
                 headers={
-                    "Content-Type": "application/json",
-                    "X-CSRF-Token": csrf_token
+                    "Content-Type": "application/json"
                 },
                 timeout=self.timeout
             )
@@ -512,13 +1191,14 @@ class SAPWriteService:
         
         try:
             logger.info(f"Committing transaction: {transaction_id}")
-            response = session.post(
+            response = self._post_with_csrf(
+                session,
                 url,
-                json=payload,
+                csrf_token,
                 headers={
-                    "Content-Type": "application/json",
-                    "X-CSRF-Token": csrf_token
+                    "Content-Type": "application/json"
                 },
+                json=payload,
                 timeout=self.timeout
             )
             response.raise_for_status()
@@ -559,13 +1239,15 @@ class SAPWriteService:
     
     def get_messages(self, transaction_id: str) -> List[Dict[str, Any]]:
         """Get error messages for a transaction"""
-        # Create new session for this request
-        session, csrf_token = self._get_csrf_token()
+        session, csrf_token = self._ensure_csrf()
+        return self._get_messages(session, csrf_token, transaction_id)
+    
+    def _get_messages(self, session: requests.Session, csrf_token: str, transaction_id: str) -> List[Dict[str, Any]]:
+        """Get error messages for a transaction using an existing session"""
+        url = f"{self.api_url}/Message"
+        params = {"Transactionid": transaction_id}
         
         try:
-            url = f"{self.api_url}/Message"
-            params = {"Transactionid": transaction_id}
-            
             logger.debug(f"Getting messages for transaction: {transaction_id}")
             response = session.get(
                 url,
@@ -582,9 +1264,6 @@ class SAPWriteService:
         except Exception as e:
             logger.warning(f"Failed to get messages: {str(e)}")
             return []
-        
-        finally:
-            session.close()
     
     def _initiate_parallel_process(
         self,
@@ -608,13 +1287,14 @@ class SAPWriteService:
         
         try:
             logger.info("Initiating parallel process")
-            response = session.post(
+            response = self._post_with_csrf(
+                session,
                 url,
-                json=payload,
+                csrf_token,
                 headers={
-                    "Content-Type": "application/json",
-                    "X-CSRF-Token": csrf_token
+                    "Content-Type": "application/json"
                 },
+                json=payload,
                 timeout=self.timeout
             )
             response.raise_for_status()
@@ -632,10 +1312,67 @@ class SAPWriteService:
             logger.error(f"Failed to initiate parallel process: {str(e)}")
             raise
     
-    def _send_batch_parallel(
+    def _async_client(self, session: requests.Session, max_workers: int) -> httpx.AsyncClient:
+        """Build the HTTP/2 client used for concurrent batch POSTs"""
+        # httpx multiplexes HTTP/2 requests over one connection on its own; the pool
+        # still allows a connection per worker for gateways that fall back to HTTP/1.1
+        limits = httpx.Limits(max_connections=max_workers, max_keepalive_connections=max_workers)
+        
+        # Reuse the CSRF session cookies: SAP binds the token to the session
+        return httpx.AsyncClient(
+            http2=True,
+            auth=(self.username, self.password),
+            cookies=session.cookies.copy(),
+            timeout=self.timeout,
+            limits=limits
+        )
+    
+    async def _send_batches_async(
         self,
         url: str,
-        batch: pd.DataFrame,
+        batches: List[SegmentData],
+        transaction_id: str,
+        session: requests.Session,
+        csrf_token: str,
+        primary_key: str,
+        period_field: str,
+        max_workers: int
+    ) -> tuple[List[Dict[str, Any]], List[int]]:
+        """Send all batches over one HTTP/2 client; returns (results, failed batch indexes)"""
+        semaphore = asyncio.BoundedSemaphore(max_workers)
+        
+        async with self._async_client(session, max_workers) as client:
+            outcomes = await asyncio.gather(
+                *[
+                    self._send_batch_parallel(
+                        client, semaphore, url, batch, transaction_id,
+                        csrf_token, primary_key, period_field, idx
+                    )
+                    for idx, batch in enumerate(batches, 1)
+                ],
+                return_exceptions=True
+            )
+        
+        results = []
+        failed_batches = []
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for idx, outcome in enumerate(outcomes, 1):
+            if isinstance(outcome, Exception):
+                logger.error(f"Batch {idx} failed: {str(outcome)}")
+                failed_batches.append(idx)
+            else:
+                results.append(outcome)
+                if debug:
+                    logger.debug("Batch %d completed successfully", idx)
+        
+        return results, failed_batches
+    
+    async def _send_batch_parallel(
+        self,
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        url: str,
+        batch: SegmentData,
         transaction_id: str,
         csrf_token: str,
         primary_key: str,
@@ -643,12 +1380,9 @@ class SAPWriteService:
         batch_idx: int
     ) -> Dict[str, Any]:
         """Send a single batch in parallel processing"""
-        # Create new session for this thread
-        session = requests.Session()
-        session.auth = (self.username, self.password)
-        
-        try:
-            payload = self._prepare_payload(
+        async with semaphore:
+            # Encode and compress off the event loop so batches are prepared concurrently
+            body = await self._encode_off_loop(
                 segment_data=batch,
                 transaction_id=transaction_id,
                 primary_key=primary_key,
@@ -656,15 +1390,7 @@ class SAPWriteService:
                 do_commit=False
             )
             
-            response = session.post(
-                url,
-                json=payload,
-                headers={
-                    "Content-Type": "application/json",
-                    "X-CSRF-Token": csrf_token
-                },
-                timeout=self.timeout
-            )
+            response = await self._post_batch_async(client, url, body, csrf_token, batch_idx)
             response.raise_for_status()
             
             return {
@@ -672,6 +1398,49 @@ class SAPWriteService:
                 "records": len(batch),
                 "status": "success"
             }
+    
+    async def _post_batch_async(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        body: bytes,
+        csrf_token: str,
+        batch_idx: int
+    ) -> httpx.Response:
+        """
+        POST an encoded batch, refreshing a rejected CSRF token and retrying transient failures
         
-        finally:
-            session.close()
\ No newline at end of file
+        Mirrors the urllib3 Retry policy of the requests session: up to RETRY_TOTAL
+        retries on connection errors and RETRY_STATUSES, with jittered exponential
+        backoff that honours Retry-After (capped at RETRY_AFTER_MAX). Read errors and
+        timeouts are raised, since SAP may already have received the batch.
+        """
+        headers = self._payload_headers
+        for attempt in range(RETRY_TOTAL + 1):
+            # Pick up a token another batch already refreshed instead of being rejected with the old one
+            csrf_token = self._current_csrf(csrf_token)
+            try:
+                response = await client.post(url, content=body, headers={**headers, "X-CSRF-Token": csrf_token})
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                if attempt == RETRY_TOTAL:
+                    raise
+                delay = RETRY_BACKOFF_FACTOR * 2 ** attempt * random.uniform(0.5, 1.0)
+                logger.warning(f"Batch {batch_idx} attempt {attempt + 1} failed ({str(e)}), retrying in {delay:.1f}s")
+            else:
+                if self._csrf_required(response):
+                    # The new token is bound to the shared session's cookies; hand them to the client
+                    csrf_token = await asyncio.to_thread(self._refresh_csrf, csrf_token)
+                    client.cookies.update(self._session.cookies)
+                    continue
+                if response.status_code not in RETRY_STATUSES or attempt == RETRY_TOTAL:
+                    return response
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = min(float(retry_after), RETRY_AFTER_MAX)
+                else:
+                    delay = RETRY_BACKOFF_FACTOR * 2 ** attempt * random.uniform(0.5, 1.0)
+                logger.warning(f"Batch {batch_idx} got HTTP {response.status_code}, retrying in {delay:.1f}s")
+            
+            await asyncio.sleep(delay)
+        
+        return response
@@ -0,0 +1,10 @@
+import asyncio
+from concurrent.futures import Executor
+from functools import partial
+from typing import Any, Callable, Optional
+
+
+async def run_blocking(executor: Optional[Executor], func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking call (SAP HTTP I/O, pandas work) on an executor so the event loop stays free"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
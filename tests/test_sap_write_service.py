@@ -0,0 +1,60 @@
+"""
+tests/test_sap_write_service.py
+
+Payload encoding of the SAP write service
+"""
+
+import gzip
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+os.environ.setdefault("SAP_API_URL", "http://sap.invalid/read")
+os.environ.setdefault("SAP_USERNAME", "user")
+os.environ.setdefault("SAP_PASSWORD", "password")
+os.environ.setdefault("SAP_WRITE_API_URL", "http://sap.invalid/write")
+os.environ.setdefault("SAP_PLANNING_AREA", "SAP1")
+
+from app.services.sap_write_service import SAPWriteService, _encode_string_column
+
+# Escaped quotes and backslashes next to the '","' list separator
+TRICKY_IDS = ['P1', 'x",', 'a\\', '"', ',"P', 'q\\",\\"', 'P3']
+
+
+@pytest.fixture
+def service():
+    service = SAPWriteService()
+    yield service
+    service.close()
+
+
+def test_encode_string_column_keeps_escaped_values_intact():
+    fragments, quoted = _encode_string_column(np.array(TRICKY_IDS, dtype=object), None)
+
+    decoded = [json.loads(b'"' + f + b'"' if quoted else f) for f in fragments]
+    assert decoded == TRICKY_IDS
+
+
+def test_encode_payload_is_valid_json_for_escaped_ids(service):
+    segment_data = pd.DataFrame({
+        "PRDID": TRICKY_IDS,
+        "XYZ_Segment": ["X"] * len(TRICKY_IDS),
+        "PERIODID3_TSTAMP": ["2024-01-01T00:00:00"] * len(TRICKY_IDS)
+    })
+
+    body = service._encode_payload(
+        segment_data=segment_data,
+        transaction_id="T1",
+        primary_key="PRDID",
+        period_field="PERIODID3_TSTAMP",
+        do_commit=False
+    )
+    if service.compress_requests:
+        body = gzip.decompress(body)
+
+    payload = json.loads(body)
+    records = payload[service._nav_property_name]
+    assert [record["PRDID"] for record in records] == TRICKY_IDS